@@ -0,0 +1,175 @@
+"""Admission control and load shedding for the API.
+
+Requests are matched to a RoutePolicy by method and path. Each policy has its own
+concurrency limit and a bounded wait queue with a deadline, and all policies share
+a global limit sized to the DB connection pool. When a global slot frees up, the
+waiter with the best (lowest) priority gets it, so cheap reads overtake heavy
+list/export calls. A request that cannot be admitted in time gets an immediate
+503 with Retry-After instead of piling up on the threadpool and DB pool.
+"""
+from starlette.responses import JSONResponse
+from typing import Iterable, List, Optional
+import asyncio
+import heapq
+import itertools
+import re
+import time
+
+
+class PriorityLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, priority: int, timeout: float) -> bool:
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return True
+        if timeout <= 0:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.waiting += 1
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand the slot on if we were just granted one
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+
+        if future.done():
+            return True
+        future.cancel()
+        return False
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.cancelled():
+                # The slot passes straight to the waiter, so active is unchanged
+                future.set_result(True)
+                return
+        self.active -= 1
+
+
+class RoutePolicy:
+    def __init__(self, name: str, pattern: str, methods: Optional[Iterable[str]] = None, max_concurrency: int = 10,
+                 max_queue: int = 50, queue_timeout: float = 1.0, priority: int = 1, retry_after: int = 1):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.methods = {method.upper() for method in methods} if methods else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priority = priority
+        self.retry_after = retry_after
+        self.limiter = PriorityLimiter(max_concurrency)
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.methods is None or method in self.methods) and self.pattern.match(path) is not None
+
+    def stats(self) -> dict:
+        return {
+            "priority": self.priority,
+            "max_concurrency": self.limiter.limit,
+            "active": self.limiter.active,
+            "queue_depth": self.limiter.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+class AdmissionController:
+    def __init__(self, policies: List[RoutePolicy], max_concurrency: int, exempt_paths: Iterable[str] = ()):
+        self.policies = policies
+        self.global_limiter = PriorityLimiter(max_concurrency)
+        # Regexes for paths that never touch the threadpool or DB pool
+        self.exempt_paths = [re.compile(pattern) for pattern in exempt_paths]
+
+    def match(self, method: str, path: str) -> Optional[RoutePolicy]:
+        if any(pattern.fullmatch(path) for pattern in self.exempt_paths):
+            return None
+        for policy in self.policies:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    async def admit(self, policy: RoutePolicy) -> bool:
+        if policy.limiter.waiting >= policy.max_queue and policy.limiter.active >= policy.limiter.limit:
+            policy.shed_queue_full += 1
+            return False
+
+        deadline = time.monotonic() + policy.queue_timeout
+        if not await policy.limiter.acquire(policy.priority, policy.queue_timeout):
+            policy.shed_timeout += 1
+            return False
+        try:
+            admitted = await self.global_limiter.acquire(policy.priority, deadline - time.monotonic())
+        except asyncio.CancelledError:
+            # Give the route slot back, or the route loses capacity for good
+            policy.limiter.release()
+            raise
+        if not admitted:
+            policy.limiter.release()
+            policy.shed_timeout += 1
+            return False
+
+        policy.admitted += 1
+        return True
+
+    def release(self, policy: RoutePolicy):
+        self.global_limiter.release()
+        policy.limiter.release()
+
+    def stats(self) -> dict:
+        return {
+            "global": {
+                "max_concurrency": self.global_limiter.limit,
+                "active": self.global_limiter.active,
+                "queue_depth": self.global_limiter.waiting,
+            },
+            "routes": {policy.name: policy.stats() for policy in self.policies},
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.controller.match(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.admit(policy):
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(policy.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(policy)
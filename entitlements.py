@@ -0,0 +1,132 @@
+"""In-memory index of subscription intervals for entitlement checks.
+
+Each user maps to a tuple of (start_date, end_date, status, subscriber_id,
+updated_at) intervals sorted by start_date. updated_at is the row version: an
+upsert older than the stored interval is ignored, so concurrent updates that
+reach the index out of commit order cannot roll it back. Writers rebuild a
+user's tuple under a lock and swap it in with a single dict assignment, so
+readers never lock and never touch the database. The index is per process: it is
+warmed at startup and kept current by the subscription endpoints of the same
+process. Writes made by other workers or hosts are picked up by refresh(), which
+re-reads subscriptions and subscription tombstones changed since the previous
+pass, so staleness is bounded by the refresh interval.
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
+import threading
+import time
+from . import models
+
+ENTITLED_STATUSES = (models.SubscriptionStatus.ACTIVE, models.SubscriptionStatus.TRIAL)
+
+# Re-read a window before the previous refresh, so rows whose updated_at was
+# stamped before that refresh but committed after it are not missed
+ENTITLEMENT_REFRESH_OVERLAP = timedelta(seconds=60)
+# How long a deleted subscription ID is remembered to fence off late upserts
+DELETED_RETENTION_SECONDS = 3600
+
+Interval = Tuple[date, date, models.SubscriptionStatus, int, datetime]
+
+
+class EntitlementIndex:
+    def __init__(self):
+        self._intervals: Dict[int, Tuple[Interval, ...]] = {}
+        self._owners: Dict[int, int] = {}  # subscriber_id -> user_id
+        # Subscription IDs are never reused, so a deleted ID stays deleted even if a
+        # late upsert for it arrives after the delete. Maps ID -> monotonic delete time.
+        self._deleted: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[datetime] = None
+        self.warmed = False
+
+    def warm(self, db: Session, batch_size: int = 10000):
+        started_at = datetime.utcnow()
+        intervals: Dict[int, list] = {}
+        query = db.query(
+            models.Subscription.user_id, models.Subscription.start_date, models.Subscription.end_date,
+            models.Subscription.status, models.Subscription.subscriber_id, models.Subscription.updated_at,
+        ).yield_per(batch_size)
+        owners = {}
+        for user_id, start_date, end_date, status, subscriber_id, updated_at in query:
+            intervals.setdefault(user_id, []).append((start_date, end_date, status, subscriber_id, updated_at))
+            owners[subscriber_id] = user_id
+
+        with self._lock:
+            self._intervals = {user_id: tuple(sorted(rows)) for user_id, rows in intervals.items()}
+            self._owners = owners
+            self._refreshed_at = started_at
+            self.warmed = True
+
+    def refresh(self, db: Session, batch_size: int = 10000):
+        if self._refreshed_at is None:
+            self.warm(db, batch_size)
+            return
+        started_at = datetime.utcnow()
+        since = self._refreshed_at - ENTITLEMENT_REFRESH_OVERLAP
+
+        # Re-applying rows already in the index is harmless: upserts are versioned
+        changed = db.query(
+            models.Subscription.user_id, models.Subscription.start_date, models.Subscription.end_date,
+            models.Subscription.status, models.Subscription.subscriber_id, models.Subscription.updated_at,
+        ).filter(models.Subscription.updated_at >= since).yield_per(batch_size)
+        for subscription in changed:
+            self.upsert(subscription)
+
+        deleted = db.query(models.DeletedRecord.entity_id).filter(
+            models.DeletedRecord.entity == "subscriptions", models.DeletedRecord.deleted_at >= since
+        ).yield_per(batch_size)
+        for (subscriber_id,) in deleted:
+            self.remove(subscriber_id)
+
+        cutoff = time.monotonic() - DELETED_RETENTION_SECONDS
+        with self._lock:
+            self._deleted = {key: value for key, value in self._deleted.items() if value >= cutoff}
+            self._refreshed_at = started_at
+
+    def upsert(self, subscription: models.Subscription):
+        interval = (subscription.start_date, subscription.end_date, subscription.status,
+                    subscription.subscriber_id, subscription.updated_at)
+        with self._lock:
+            if subscription.subscriber_id in self._deleted:
+                return
+            rows = []
+            for row in self._intervals.get(subscription.user_id, ()):
+                if row[3] != subscription.subscriber_id:
+                    rows.append(row)
+                elif row[4] > subscription.updated_at:
+                    return
+            self._intervals[subscription.user_id] = tuple(sorted(rows + [interval]))
+            self._owners[subscription.subscriber_id] = subscription.user_id
+
+    def remove(self, subscriber_id: int):
+        with self._lock:
+            self._deleted[subscriber_id] = time.monotonic()
+            user_id = self._owners.pop(subscriber_id, None)
+            if user_id is None:
+                return
+            rows = tuple(row for row in self._intervals.get(user_id, ()) if row[3] != subscriber_id)
+            if rows:
+                self._intervals[user_id] = rows
+            else:
+                self._intervals.pop(user_id, None)
+
+    def remove_user(self, user_id: int):
+        with self._lock:
+            for row in self._intervals.pop(user_id, ()):
+                self._deleted[row[3]] = time.monotonic()
+                self._owners.pop(row[3], None)
+
+    def check(self, user_id: int, on: date) -> Optional[Interval]:
+        """Return the entitling interval that runs longest on the given day, if any."""
+        best = None
+        for interval in self._intervals.get(user_id, ()):
+            start_date, end_date, status = interval[:3]
+            if start_date > on:
+                break
+            if end_date >= on and status in ENTITLED_STATUSES and (best is None or end_date > best[1]):
+                best = interval
+        return best
+
+
+entitlement_index = EntitlementIndex()
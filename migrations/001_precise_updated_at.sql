@@ -0,0 +1,19 @@
+-- Upgrade an existing MySQL database created before conditional GETs.
+-- create_all() only creates missing tables, so these column and index changes
+-- on existing tables have to be applied by hand:
+--
+--     mysql project < migrations/001_precise_updated_at.sql
+
+-- updated_at with microsecond precision: strong ETags rely on two writes to the
+-- same row getting different values
+ALTER TABLE users MODIFY updated_at DATETIME(6) NOT NULL;
+ALTER TABLE subscriptions MODIFY updated_at DATETIME(6) NOT NULL;
+ALTER TABLE payments MODIFY updated_at DATETIME(6) NOT NULL;
+ALTER TABLE notifications MODIFY updated_at DATETIME(6) NOT NULL;
+ALTER TABLE tickets MODIFY updated_at DATETIME(6) NOT NULL;
+
+-- count/max(updated_at) per user behind conditional GETs on per-user lists
+CREATE INDEX ix_subscriptions_user_id_updated_at ON subscriptions (user_id, updated_at);
+CREATE INDEX ix_payments_user_id_updated_at ON payments (user_id, updated_at);
+CREATE INDEX ix_notifications_user_id_updated_at ON notifications (user_id, updated_at);
+CREATE INDEX ix_tickets_user_id_updated_at ON tickets (user_id, updated_at);
@@ -0,0 +1,23 @@
+-- Upgrade an existing MySQL database created before the change feed. Run after
+-- 001_precise_updated_at.sql:
+--
+--     mysql project < migrations/002_change_feed.sql
+
+-- (updated_at, id) keyset pagination for GET /changes and the entitlement refresh
+CREATE INDEX ix_users_updated_at_user_id ON users (updated_at, user_id);
+CREATE INDEX ix_subscriptions_updated_at_subscriber_id ON subscriptions (updated_at, subscriber_id);
+CREATE INDEX ix_payments_updated_at_payment_id ON payments (updated_at, payment_id);
+CREATE INDEX ix_notifications_updated_at_notification_id ON notifications (updated_at, notification_id);
+CREATE INDEX ix_tickets_updated_at_ticket_id ON tickets (updated_at, ticket_id);
+
+-- Change feed tombstones. create_all() also creates this table; if it already
+-- exists with second-precision deleted_at, widen the column.
+CREATE TABLE IF NOT EXISTS deleted_records (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    entity VARCHAR(32) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    deleted_at DATETIME(6) NOT NULL,
+    PRIMARY KEY (id),
+    INDEX ix_deleted_records_entity_deleted_at_id (entity, deleted_at, id)
+);
+ALTER TABLE deleted_records MODIFY deleted_at DATETIME(6) NOT NULL;
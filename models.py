@@ -1,11 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, DECIMAL, Boolean, Text, ForeignKey, DATE
+from sqlalchemy import Column, Integer, String, DateTime, Enum, DECIMAL, Boolean, Text, ForeignKey, DATE, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 import enum
 
 Base = declarative_base()
 
+# Microsecond precision on MySQL (plain DATETIME rounds to the second), so two
+# writes in the same second still get distinct updated_at values and ETags.
+# Existing databases need migrations/001_precise_updated_at.sql.
+PreciseDateTime = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
 # Enums
 class UserRole(str, enum.Enum):
     USER = "User"
@@ -74,6 +80,10 @@ class TicketType(str, enum.Enum):
 # Models
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # (updated_at, id) indexes back the keyset pagination of GET /changes
+        Index("ix_users_updated_at_user_id", "updated_at", "user_id"),
+    )
     
     user_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -82,7 +92,7 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     status = Column(Enum(UserStatus), default=UserStatus.ACTIVE, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     last_login = Column(DateTime)
     
     # Relationships
@@ -95,6 +105,11 @@ class User(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Covers the count/max(updated_at) lookup behind conditional GETs on per-user lists
+        Index("ix_subscriptions_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_subscriptions_updated_at_subscriber_id", "updated_at", "subscriber_id"),
+    )
     
     subscriber_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
@@ -103,7 +118,7 @@ class Subscription(Base):
     status = Column(Enum(SubscriptionStatus), default=SubscriptionStatus.TRIAL, nullable=False)
     auto_renew = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="subscriptions")
@@ -112,6 +127,10 @@ class Subscription(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_payments_updated_at_payment_id", "updated_at", "payment_id"),
+    )
     
     payment_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
@@ -122,7 +141,7 @@ class Payment(Base):
     reference_number = Column(String(255), unique=True, nullable=False, index=True)
     transaction_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="payments")
@@ -131,6 +150,10 @@ class Payment(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_notifications_updated_at_notification_id", "updated_at", "notification_id"),
+    )
     
     notification_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
@@ -140,7 +163,7 @@ class Notification(Base):
     status = Column(Enum(NotificationStatus), default=NotificationStatus.DELIVERED, nullable=False)
     priority = Column(Enum(Priority), default=Priority.MEDIUM, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="notifications")
@@ -148,6 +171,10 @@ class Notification(Base):
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        Index("ix_tickets_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_tickets_updated_at_ticket_id", "updated_at", "ticket_id"),
+    )
     
     ticket_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
@@ -158,9 +185,44 @@ class Ticket(Base):
     ticket_type = Column(Enum(TicketType), nullable=False)
     assigned_to = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     ended_at = Column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="tickets")
     assigned_staff = relationship("User", foreign_keys=[assigned_to], back_populates="assigned_tickets")
+
+
+# Existing databases need migrations/002_change_feed.sql for the (updated_at, id)
+# indexes and the microsecond deleted_at below.
+class DeletedRecord(Base):
+    __tablename__ = "deleted_records"
+    __table_args__ = (
+        Index("ix_deleted_records_entity_deleted_at_id", "entity", "deleted_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(PreciseDateTime, default=datetime.utcnow, nullable=False)
+
+
+# Tombstones for the change feed. Registered per mapper so rows removed through
+# ORM cascades (e.g. a user's payments when the user is deleted) are captured too.
+TRACKED_ENTITIES = {
+    "users": (User, "user_id"),
+    "subscriptions": (Subscription, "subscriber_id"),
+    "payments": (Payment, "payment_id"),
+    "tickets": (Ticket, "ticket_id"),
+    "notifications": (Notification, "notification_id"),
+}
+
+def _record_delete(entity, pk_name):
+    def after_delete(mapper, connection, target):
+        connection.execute(DeletedRecord.__table__.insert().values(
+            entity=entity, entity_id=getattr(target, pk_name), deleted_at=datetime.utcnow()
+        ))
+    return after_delete
+
+for _entity, (_model, _pk_name) in TRACKED_ENTITIES.items():
+    event.listen(_model, "after_delete", _record_delete(_entity, _pk_name))
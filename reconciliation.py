@@ -0,0 +1,211 @@
+"""Nightly reconciliation of gateway settlement files against Payment.reference_number.
+
+The settlement file is streamed in chunks so memory stays bounded regardless of
+file size. Each chunk is matched with one indexed IN lookup on reference_number,
+status changes the gateway reports are applied with one UPDATE per status
+transition, and every discrepancy is written to a CSV mismatch report.
+
+The modules use package-relative imports, like main.py, which is served as
+`uvicorn package.main:app`. Run the CLI as a module from the directory that
+contains the checkout (here the checkout directory is `package`):
+
+    python -m package.reconciliation settlement.csv --report mismatches.csv
+
+The CLI connects through database.py and the server through main.py. Both take
+the database from the DATABASE_URL environment variable and default to the same
+local MySQL database, so set DATABASE_URL once for both.
+"""
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+from itertools import islice
+import argparse
+import csv
+import json
+import sys
+from . import models
+
+RECONCILIATION_CHUNK_SIZE = 1000
+# Bounds memory per chunk and the size of the reference_number IN list
+RECONCILIATION_MAX_CHUNK_SIZE = 10000
+
+# Gateway status -> payment statuses it may overwrite. Anything else that
+# disagrees with the database is reported but left untouched.
+SETTLEMENT_TRANSITIONS = {
+    models.PaymentStatus.SUCCESS: [models.PaymentStatus.PENDING],
+    models.PaymentStatus.FAILED: [models.PaymentStatus.PENDING],
+    models.PaymentStatus.REFUNDED: [models.PaymentStatus.SUCCESS],
+}
+
+REPORT_FIELDS = ["line", "reference_number", "issue", "file_amount", "db_amount", "file_status", "db_status"]
+
+
+class ReconciliationSummary(BaseModel):
+    lines: int = 0
+    matched: int = 0
+    status_updated: int = 0
+    mismatches: int = 0
+    missing: int = 0
+    invalid: int = 0
+    report_path: Optional[str] = None
+
+
+def parse_status(value) -> Optional[models.PaymentStatus]:
+    value = str(value or "").strip().lower()
+    for payment_status in models.PaymentStatus:
+        if value in (payment_status.value.lower(), payment_status.name.lower()):
+            return payment_status
+    return None
+
+
+def parse_amount(value) -> Optional[Decimal]:
+    try:
+        return Decimal(str(value).strip()).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def read_records(stream: TextIO, file_format: str) -> Iterator[dict]:
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+    elif file_format == "jsonl":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            # Unparseable lines still count and end up as invalid_record
+            yield record if isinstance(record, dict) else {}
+    else:
+        raise ValueError(f"Unsupported settlement file format: {file_format}")
+
+
+def detect_format(path: str) -> str:
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def reconcile_chunk(db: Session, records: List[tuple], report: csv.DictWriter, summary: ReconciliationSummary):
+    def mismatch(line, reference, issue, record=None, payment=None, db_status=None):
+        summary.mismatches += 1
+        report.writerow({
+            "line": line,
+            "reference_number": reference,
+            "issue": issue,
+            "file_amount": record.get("amount") if record else None,
+            "db_amount": payment.amount if payment else None,
+            "file_status": record.get("status") if record else None,
+            "db_status": (db_status or payment.payment_status).value if payment else None,
+        })
+
+    references = list({str(record.get("reference_number") or "").strip() for _, record in records} - {""})
+    payments = {
+        payment.reference_number: payment
+        for payment in db.query(
+            models.Payment.payment_id, models.Payment.reference_number, models.Payment.amount, models.Payment.payment_status
+        ).filter(models.Payment.reference_number.in_(references)).all()
+    }
+
+    # Status each payment has after the earlier lines of this chunk, so a reference
+    # repeated within a chunk is judged exactly as if it fell in the next chunk
+    effective: Dict[int, models.PaymentStatus] = {}
+    for line, record in records:
+        reference = str(record.get("reference_number") or "").strip()
+        amount = parse_amount(record.get("amount"))
+        file_status = parse_status(record.get("status"))
+        if not reference or amount is None or file_status is None:
+            summary.invalid += 1
+            mismatch(line, reference, "invalid_record", record)
+            continue
+
+        payment = payments.get(reference)
+        if payment is None:
+            summary.missing += 1
+            mismatch(line, reference, "missing_payment", record)
+            continue
+
+        summary.matched += 1
+        current = effective.get(payment.payment_id, payment.payment_status)
+        if amount != payment.amount:
+            mismatch(line, reference, "amount_mismatch", record, payment, current)
+        elif file_status != current:
+            if current in SETTLEMENT_TRANSITIONS.get(file_status, []):
+                effective[payment.payment_id] = file_status
+            else:
+                mismatch(line, reference, "status_conflict", record, payment, current)
+
+    # One guarded UPDATE per (from, to) pair; the guard skips rows changed concurrently
+    updates: Dict[tuple, List[int]] = {}
+    for payment in payments.values():
+        target = effective.get(payment.payment_id)
+        if target is not None and target != payment.payment_status:
+            updates.setdefault((payment.payment_status, target), []).append(payment.payment_id)
+
+    now = datetime.utcnow()
+    for (previous, target), payment_ids in updates.items():
+        summary.status_updated += db.query(models.Payment).filter(
+            models.Payment.payment_id.in_(payment_ids),
+            models.Payment.payment_status == previous,
+        ).update({models.Payment.payment_status: target, models.Payment.updated_at: now}, synchronize_session=False)
+    db.commit()
+
+
+def run_reconciliation(db: Session, stream: TextIO, file_format: str, report_stream: TextIO,
+                       chunk_size: int = RECONCILIATION_CHUNK_SIZE) -> ReconciliationSummary:
+    if not 1 <= chunk_size <= RECONCILIATION_MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {RECONCILIATION_MAX_CHUNK_SIZE}")
+    summary = ReconciliationSummary()
+    report = csv.DictWriter(report_stream, fieldnames=REPORT_FIELDS)
+    report.writeheader()
+
+    # Line numbers count data rows, starting at 1
+    records: Iterable[tuple] = enumerate(read_records(stream, file_format), start=1)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        summary.lines += len(chunk)
+        reconcile_chunk(db, chunk, report, summary)
+    return summary
+
+
+def chunk_size_arg(value: str) -> int:
+    chunk_size = int(value)
+    if not 1 <= chunk_size <= RECONCILIATION_MAX_CHUNK_SIZE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {RECONCILIATION_MAX_CHUNK_SIZE}")
+    return chunk_size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile a gateway settlement file against payments")
+    parser.add_argument("settlement_file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--report", default="-", help="mismatch report path (default: stdout)")
+    parser.add_argument("--chunk-size", type=chunk_size_arg, default=RECONCILIATION_CHUNK_SIZE)
+    parser.add_argument("--echo", action="store_true", help="log SQL statements")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, engine
+    engine.echo = args.echo
+
+    file_format = args.format or detect_format(args.settlement_file)
+    db = SessionLocal()
+    report_stream = sys.stdout if args.report == "-" else open(args.report, "w", newline="")
+    try:
+        with open(args.settlement_file, encoding="utf-8-sig", newline="") as stream:
+            summary = run_reconciliation(db, stream, file_format, report_stream, args.chunk_size)
+    finally:
+        db.close()
+        if report_stream is not sys.stdout:
+            report_stream.close()
+
+    if args.report != "-":
+        summary.report_path = args.report
+    print(summary.model_dump_json(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+import random
+
+from ..admission import AdmissionController, RoutePolicy
+
+
+def make_controller():
+    policies = [
+        RoutePolicy("heavy", r"^/heavy", max_concurrency=6, max_queue=500, queue_timeout=5.0, priority=2),
+        RoutePolicy("cheap", r"^/cheap", max_concurrency=8, max_queue=500, queue_timeout=5.0, priority=0),
+    ]
+    # Global limit below the route limits, so some tasks are cancelled while holding
+    # a route slot and waiting for a global one
+    return AdmissionController(policies, max_concurrency=3)
+
+
+async def handle(controller, policy):
+    if not await controller.admit(policy):
+        return
+    try:
+        await asyncio.sleep(0.005)
+    finally:
+        controller.release(policy)
+
+
+def test_cancelled_waiters_release_all_slots():
+    async def scenario():
+        controller = make_controller()
+        rng = random.Random(0)
+        tasks = [
+            asyncio.create_task(handle(controller, controller.policies[i % 2]))
+            for i in range(500)
+        ]
+        await asyncio.sleep(0)
+        for task in rng.sample(tasks, 100):
+            task.cancel()
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["global"]["active"] == 0
+    assert stats["global"]["queue_depth"] == 0
+    for route in stats["routes"].values():
+        assert route["active"] == 0
+        assert route["queue_depth"] == 0
+
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        controller = AdmissionController(
+            [RoutePolicy("only", r"^/", max_concurrency=1, max_queue=0, queue_timeout=0)], max_concurrency=1
+        )
+        policy = controller.policies[0]
+        assert await controller.admit(policy)
+        assert not await controller.admit(policy)
+        controller.release(policy)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["routes"]["only"]["active"] == 0
+    assert stats["routes"]["only"]["shed_queue_full"] == 1
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from .. import main, models
+
+STALE = datetime(2026, 1, 1)
+
+
+def add_ticket(db, user, status, priority=models.Priority.MEDIUM):
+    ticket = models.Ticket(user_id=user.user_id, subject="Subject", description="Description", status=status,
+                           priority=priority, ticket_type=models.TicketType.SUPPORT, updated_at=STALE)
+    db.add(ticket)
+    db.commit()
+    return ticket.ticket_id
+
+
+def close_tickets(db, ids):
+    return main.bulk_transition(db, models.Ticket, models.Ticket.ticket_id, models.Ticket.status, ids,
+                                models.TicketStatus.CLOSED, main.TICKET_CLOSABLE,
+                                [models.Ticket.ended_at, models.Ticket.updated_at])
+
+
+def resolve_ticket_ids(db, ids=None, **filters):
+    return main.resolve_bulk_ids(db, models.Ticket.ticket_id, models.Ticket.status, main.TICKET_CLOSABLE, ids, {
+        getattr(models.Ticket, column): value for column, value in filters.items()
+    })
+
+
+def test_outcomes_per_id(db, user):
+    open_id = add_ticket(db, user, models.TicketStatus.OPEN)
+    closed_id = add_ticket(db, user, models.TicketStatus.CLOSED)
+    in_progress_id = add_ticket(db, user, models.TicketStatus.IN_PROGRESS)
+
+    result = close_tickets(db, [open_id, closed_id, 999, in_progress_id])
+
+    assert result.requested == 4
+    assert result.updated == 2
+    assert [(row.id, row.outcome, row.previous_status) for row in result.results] == [
+        (open_id, "updated", "Open"),
+        (closed_id, "unchanged", "Closed"),
+        (999, "not_found", None),
+        (in_progress_id, "updated", "In-progress"),
+    ]
+    db.expire_all()
+    for ticket_id in (open_id, in_progress_id):
+        ticket = db.get(models.Ticket, ticket_id)
+        assert ticket.status == models.TicketStatus.CLOSED
+        assert ticket.ended_at is not None
+        assert ticket.updated_at > STALE
+    assert db.get(models.Ticket, closed_id).updated_at == STALE
+
+
+def test_disallowed_source_status_is_an_invalid_transition(db, user):
+    payment = models.Payment(user_id=user.user_id, amount=10, payment_method=models.PaymentMethod.UPI,
+                             payment_status=models.PaymentStatus.FAILED, reference_number="REF-1",
+                             transaction_date=STALE)
+    db.add(payment)
+    db.commit()
+
+    result = main.bulk_transition(db, models.Payment, models.Payment.payment_id, models.Payment.payment_status,
+                                  [payment.payment_id], models.PaymentStatus.SUCCESS,
+                                  main.PAYMENT_TRANSITIONS[models.PaymentStatus.SUCCESS], [models.Payment.updated_at])
+
+    assert result.updated == 0
+    assert result.results[0].outcome == "invalid_transition"
+    assert result.results[0].previous_status == "Failed"
+
+
+def test_chunks_cover_every_id(db, user, monkeypatch):
+    monkeypatch.setattr(main, "BULK_CHUNK_SIZE", 2)
+    ids = [add_ticket(db, user, models.TicketStatus.OPEN) for _ in range(5)]
+
+    result = close_tickets(db, ids)
+
+    assert result.updated == 5
+    assert [row.id for row in result.results] == ids
+
+
+def test_id_list_is_deduplicated_in_order(db, user):
+    first = add_ticket(db, user, models.TicketStatus.OPEN)
+    second = add_ticket(db, user, models.TicketStatus.OPEN)
+
+    assert resolve_ticket_ids(db, [second, first, second]) == [second, first]
+
+
+def test_filter_selects_only_transitionable_rows(db, user):
+    urgent = add_ticket(db, user, models.TicketStatus.OPEN, models.Priority.URGENT)
+    add_ticket(db, user, models.TicketStatus.OPEN, models.Priority.LOW)
+    add_ticket(db, user, models.TicketStatus.CLOSED, models.Priority.URGENT)
+
+    assert resolve_ticket_ids(db, priority=models.Priority.URGENT, assigned_to=None) == [urgent]
+
+
+@pytest.mark.parametrize("ids, filters", [
+    ([1], {"user_id": 1}),
+    (None, {}),
+    (None, {"assigned_to": None}),
+])
+def test_id_list_and_filter_are_mutually_exclusive(db, ids, filters):
+    with pytest.raises(HTTPException) as error:
+        resolve_ticket_ids(db, ids, **filters)
+    assert error.value.status_code == 400
+
+
+def test_too_many_ids_are_rejected(db, monkeypatch):
+    monkeypatch.setattr(main, "BULK_MAX_IDS", 2)
+    with pytest.raises(HTTPException) as error:
+        resolve_ticket_ids(db, [1, 2, 3])
+    assert error.value.status_code == 400
@@ -0,0 +1,116 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from .. import main, models
+
+BASE = datetime(2026, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def no_lag(monkeypatch):
+    monkeypatch.setattr(main, "CHANGE_FEED_LAG", timedelta(0))
+
+
+def add_subscription(db, user, updated_at):
+    subscription = models.Subscription(
+        user_id=user.user_id, start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), updated_at=updated_at
+    )
+    db.add(subscription)
+    db.commit()
+    return subscription.subscriber_id
+
+
+def drain(db, since=None, limit=2, entity="subscriptions"):
+    """Page through the feed until has_more is false, returning (op, id) pairs and the final cursor."""
+    changes = []
+    while True:
+        page = main.get_changes(entity=entity, since=since, limit=limit, db=db)
+        assert len(page.changes) <= limit
+        changes += [(change.op, change.id) for change in page.changes]
+        since = page.next_cursor
+        if not page.has_more:
+            return changes, since
+
+
+def test_pages_in_timestamp_then_id_order(db, user):
+    # Two rows share a timestamp, so the id tie-break decides their order
+    late = add_subscription(db, user, BASE + timedelta(seconds=2))
+    tied_first = add_subscription(db, user, BASE + timedelta(seconds=1))
+    tied_second = add_subscription(db, user, BASE + timedelta(seconds=1))
+    early = add_subscription(db, user, BASE)
+
+    first = main.get_changes(entity="subscriptions", limit=2, db=db)
+    assert [change.id for change in first.changes] == [early, tied_first]
+    assert first.has_more
+
+    second = main.get_changes(entity="subscriptions", since=first.next_cursor, limit=2, db=db)
+    assert [change.id for change in second.changes] == [tied_second, late]
+    assert not second.has_more
+    assert second.changes[0].data["subscriber_id"] == tied_second
+
+    empty = main.get_changes(entity="subscriptions", since=second.next_cursor, limit=2, db=db)
+    assert empty.changes == []
+    assert not empty.has_more
+    assert empty.next_cursor == second.next_cursor
+
+
+def test_tombstones_merge_with_upserts(db, user):
+    kept = [add_subscription(db, user, BASE + timedelta(seconds=offset)) for offset in range(3)]
+    deleted = add_subscription(db, user, BASE + timedelta(seconds=3))
+    _, cursor = drain(db)
+
+    db.delete(db.get(models.Subscription, deleted))
+    db.commit()
+    subscription = db.get(models.Subscription, kept[0])
+    subscription.status = models.SubscriptionStatus.CANCELED
+    db.commit()
+
+    # One change per page, so the second change is only reached through the merged cursor
+    first = main.get_changes(entity="subscriptions", since=cursor, limit=1, db=db)
+    assert first.has_more
+    changes, _ = drain(db, first.next_cursor, limit=1)
+    changes = [(change.op, change.id) for change in first.changes] + changes
+    assert sorted(changes) == [("delete", deleted), ("upsert", kept[0])]
+
+
+def test_full_drain_sees_every_change_once(db, user):
+    ids = [add_subscription(db, user, BASE + timedelta(seconds=offset)) for offset in range(5)]
+    for subscriber_id in ids[1:4]:
+        db.delete(db.get(models.Subscription, subscriber_id))
+    db.commit()
+
+    changes, _ = drain(db, limit=2)
+    assert sorted(changes) == sorted([("upsert", ids[0]), ("upsert", ids[4])] + [("delete", i) for i in ids[1:4]])
+
+
+def test_cascaded_deletes_leave_tombstones(db, user):
+    subscriber_id = add_subscription(db, user, BASE)
+    db.delete(user)
+    db.commit()
+
+    assert drain(db, entity="subscriptions")[0] == [("delete", subscriber_id)]
+    assert drain(db, entity="users")[0] == [("delete", user.user_id)]
+
+
+def test_recent_rows_are_held_back(db, user, monkeypatch):
+    monkeypatch.setattr(main, "CHANGE_FEED_LAG", timedelta(minutes=5))
+    add_subscription(db, user, datetime.utcnow())
+
+    page = main.get_changes(entity="subscriptions", db=db)
+    assert page.changes == []
+    assert not page.has_more
+
+
+@pytest.mark.parametrize("since", ["not-a-cursor", main.encode_cursor({"upsert": None, "delete": None})[:-4]])
+def test_invalid_cursor_is_a_400(db, since):
+    with pytest.raises(HTTPException) as error:
+        main.get_changes(entity="subscriptions", since=since, db=db)
+    assert error.value.status_code == 400
+
+
+def test_unknown_entity_is_a_400(db):
+    with pytest.raises(HTTPException) as error:
+        main.get_changes(entity="deleted_records", db=db)
+    assert error.value.status_code == 400
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+
+from fastapi import Response
+from starlette.requests import Request
+
+from .. import main, models
+
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def add_subscription(db, user, updated_at):
+    subscription = models.Subscription(
+        user_id=user.user_id, start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), updated_at=updated_at
+    )
+    db.add(subscription)
+    db.commit()
+    return subscription
+
+
+def get_one(db, user, **headers):
+    response = Response()
+    result = main.conditional_get_one(
+        make_request(**headers), response, db, models.User, models.User.user_id, user.user_id, "User not found"
+    )
+    return result, response
+
+
+def get_list(db, user, **headers):
+    response = Response()
+    result = main.conditional_get_user_list(make_request(**headers), response, db, models.Subscription, user.user_id)
+    return result, response
+
+
+def test_single_resource_revalidates_by_etag_and_last_modified(db, user):
+    result, response = get_one(db, user)
+    assert result.user_id == user.user_id
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    assert get_one(db, user, if_none_match=etag)[0].status_code == 304
+    assert get_one(db, user, if_none_match=f"W/{etag}, \"other\"")[0].status_code == 304
+    assert get_one(db, user, if_modified_since=last_modified)[0].status_code == 304
+
+
+def test_single_resource_etag_changes_on_update(db, user):
+    etag = get_one(db, user)[1].headers["etag"]
+    user.name = "Renamed"
+    user.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+
+    result, response = get_one(db, user, if_none_match=etag)
+    assert result.name == "Renamed"
+    assert response.headers["etag"] != etag
+
+
+def test_list_revalidates_by_etag(db, user):
+    now = datetime.utcnow()
+    add_subscription(db, user, now - timedelta(minutes=5))
+    add_subscription(db, user, now)
+
+    rows, response = get_list(db, user)
+    assert len(rows) == 2
+    assert "last-modified" not in response.headers
+    assert get_list(db, user, if_none_match=response.headers["etag"])[0].status_code == 304
+
+
+def test_list_deleting_older_row_is_never_a_304(db, user):
+    now = datetime.utcnow()
+    older = add_subscription(db, user, now - timedelta(minutes=5))
+    add_subscription(db, user, now)
+    etag = get_list(db, user)[1].headers["etag"]
+
+    # Deleting the older row leaves max(updated_at) untouched
+    db.delete(older)
+    db.commit()
+
+    rows, response = get_list(db, user, if_none_match=etag)
+    assert len(rows) == 1
+    assert response.headers["etag"] != etag
+
+    http_date = main.http_date(now + timedelta(minutes=1))
+    rows, _ = get_list(db, user, if_modified_since=http_date)
+    assert len(rows) == 1
@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from .. import models
+from ..entitlements import EntitlementIndex
+
+TODAY = date(2026, 6, 1)
+VERSION = datetime(2026, 5, 1, 12, 0, 0)
+
+
+def interval(subscriber_id=1, user_id=1, status=models.SubscriptionStatus.ACTIVE, updated_at=VERSION,
+             start_date=date(2026, 1, 1), end_date=date(2026, 12, 31)):
+    return SimpleNamespace(user_id=user_id, subscriber_id=subscriber_id, status=status, updated_at=updated_at,
+                           start_date=start_date, end_date=end_date)
+
+
+def add_subscription(db, user, status=models.SubscriptionStatus.ACTIVE, end_date=date(2026, 12, 31)):
+    subscription = models.Subscription(user_id=user.user_id, start_date=date(2026, 1, 1), end_date=end_date,
+                                       status=status)
+    db.add(subscription)
+    db.commit()
+    return subscription
+
+
+def test_check_picks_longest_entitling_interval():
+    index = EntitlementIndex()
+    index.upsert(interval(1, end_date=date(2026, 7, 1)))
+    index.upsert(interval(2, end_date=date(2026, 9, 1)))
+    index.upsert(interval(3, status=models.SubscriptionStatus.CANCELED, end_date=date(2027, 1, 1)))
+    index.upsert(interval(4, start_date=date(2026, 7, 1), end_date=date(2027, 6, 1)))
+
+    assert index.check(1, TODAY)[3] == 2
+    assert index.check(1, date(2027, 2, 1))[3] == 4
+    assert index.check(1, date(2025, 1, 1)) is None
+    assert index.check(99, TODAY) is None
+
+
+def test_older_upsert_does_not_roll_back_newer_state():
+    index = EntitlementIndex()
+    index.upsert(interval(status=models.SubscriptionStatus.CANCELED, updated_at=VERSION + timedelta(microseconds=1)))
+    index.upsert(interval(status=models.SubscriptionStatus.ACTIVE, updated_at=VERSION))
+
+    assert index.check(1, TODAY) is None
+
+
+def test_deleted_subscription_is_fenced_from_late_upserts():
+    index = EntitlementIndex()
+    index.upsert(interval())
+    index.remove(1)
+    index.upsert(interval(updated_at=VERSION + timedelta(seconds=1)))
+
+    assert index.check(1, TODAY) is None
+
+
+def test_remove_user_fences_all_of_their_subscriptions():
+    index = EntitlementIndex()
+    index.upsert(interval(1))
+    index.upsert(interval(2))
+    index.remove_user(1)
+    index.upsert(interval(2, updated_at=VERSION + timedelta(seconds=1)))
+
+    assert index.check(1, TODAY) is None
+
+
+def test_refresh_picks_up_writes_from_other_workers(db, user):
+    kept = add_subscription(db, user).subscriber_id
+    cancelled = add_subscription(db, user, end_date=date(2027, 12, 31))
+    deleted = add_subscription(db, user, end_date=date(2028, 12, 31))
+    deleted_id = deleted.subscriber_id
+    index = EntitlementIndex()
+    index.warm(db)
+    assert index.check(user.user_id, TODAY)[3] == deleted_id
+
+    # Another worker cancels one subscription and deletes another behind this index's back
+    cancelled.status = models.SubscriptionStatus.CANCELED
+    db.delete(deleted)
+    db.commit()
+    assert index.check(user.user_id, TODAY)[3] == deleted_id
+
+    index.refresh(db)
+    assert index.check(user.user_id, TODAY)[3] == kept
+    assert index.check(user.user_id, date(2027, 6, 1)) is None
+
+
+def test_refresh_without_warm_loads_everything(db, user):
+    subscription = add_subscription(db, user)
+    index = EntitlementIndex()
+    index.refresh(db)
+
+    assert index.warmed
+    assert index.check(user.user_id, TODAY)[3] == subscription.subscriber_id
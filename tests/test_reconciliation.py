@@ -0,0 +1,95 @@
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from .. import models, reconciliation
+
+
+def add_payment(db, user, reference, amount="10.00", status=models.PaymentStatus.PENDING):
+    payment = models.Payment(
+        user_id=user.user_id, amount=Decimal(amount), payment_method=models.PaymentMethod.UPI,
+        payment_status=status, reference_number=reference, transaction_date=datetime(2026, 1, 1),
+    )
+    db.add(payment)
+    db.commit()
+    return payment
+
+
+def reconcile(db, body, chunk_size=reconciliation.RECONCILIATION_CHUNK_SIZE, file_format="csv"):
+    report = io.StringIO()
+    summary = reconciliation.run_reconciliation(db, io.StringIO(body), file_format, report, chunk_size)
+    report.seek(0)
+    return summary, list(csv.DictReader(report))
+
+
+def payment_status(db, reference):
+    db.expire_all()
+    return db.query(models.Payment).filter(models.Payment.reference_number == reference).one().payment_status
+
+
+def test_applies_allowed_transitions_and_reports_mismatches(db, user):
+    add_payment(db, user, "ok")
+    add_payment(db, user, "amount")
+    add_payment(db, user, "refunded", status=models.PaymentStatus.PENDING)
+    body = (
+        "reference_number,amount,status\n"
+        "ok,10,success\n"
+        "amount,11,Success\n"
+        "refunded,10,Refunded\n"
+        "missing,1,Success\n"
+        "ok,abc,Success\n"
+    )
+    summary, report = reconcile(db, body)
+
+    assert (summary.lines, summary.matched, summary.status_updated) == (5, 3, 1)
+    assert (summary.missing, summary.invalid, summary.mismatches) == (1, 1, 4)
+    assert [(row["reference_number"], row["issue"]) for row in report] == [
+        ("amount", "amount_mismatch"),
+        ("refunded", "status_conflict"),
+        ("missing", "missing_payment"),
+        ("ok", "invalid_record"),
+    ]
+    assert payment_status(db, "ok") == models.PaymentStatus.SUCCESS
+    assert payment_status(db, "amount") == models.PaymentStatus.PENDING
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_conflicting_duplicate_reference_is_reported_regardless_of_chunking(db, user, chunk_size):
+    add_payment(db, user, "dup")
+    summary, report = reconcile(db, "reference_number,amount,status\ndup,10,Success\ndup,10,Failed\n", chunk_size)
+
+    assert (summary.matched, summary.status_updated, summary.mismatches) == (2, 1, 1)
+    assert report == [{
+        "line": "2", "reference_number": "dup", "issue": "status_conflict", "file_amount": "10",
+        "db_amount": "10.00", "file_status": "Failed", "db_status": "Success",
+    }]
+    assert payment_status(db, "dup") == models.PaymentStatus.SUCCESS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_chained_duplicate_reference_applies_in_file_order(db, user, chunk_size):
+    add_payment(db, user, "dup")
+    summary, report = reconcile(db, "reference_number,amount,status\ndup,10,Success\ndup,10,Refunded\n", chunk_size)
+
+    assert summary.mismatches == 0 and report == []
+    assert payment_status(db, "dup") == models.PaymentStatus.REFUNDED
+
+
+def test_jsonl_unparseable_lines_are_invalid_records(db, user):
+    add_payment(db, user, "j1")
+    body = '{"reference_number": "j1", "amount": "10", "status": "failed"}\nnot json\n'
+    summary, report = reconcile(db, body, file_format="jsonl")
+
+    assert (summary.lines, summary.status_updated, summary.invalid) == (2, 1, 1)
+    assert payment_status(db, "j1") == models.PaymentStatus.FAILED
+
+
+@pytest.mark.parametrize("chunk_size", [0, reconciliation.RECONCILIATION_MAX_CHUNK_SIZE + 1])
+def test_chunk_size_is_bounded(db, chunk_size):
+    with pytest.raises(ValueError):
+        reconcile(db, "reference_number,amount,status\n", chunk_size)
+    with pytest.raises(SystemExit):
+        reconciliation.main(["settlement.csv", "--chunk-size", str(chunk_size)])